@@ -10,200 +10,642 @@ captions into a new video file via ffmpeg.
 from __future__ import annotations
 
 import argparse
+import contextlib
 import datetime as dt
-import json
+import errno
+import itertools
+import math
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import stat
 import subprocess
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple, Union
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:  # orjson parses straight from bytes and is considerably faster when available
+    import orjson as _json
+
+    _JSON_ACCEPTS_BUFFERS = True
+except ImportError:  # pragma: no cover - optional dependency
+    import json as _json
+
+    _JSON_ACCEPTS_BUFFERS = False
+
+try:  # simdjson lets us pull out only the telemetry fields without building the full tree
+    import simdjson
+except ImportError:  # pragma: no cover - optional dependency
+    simdjson = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Linux lets us grow the FIFO buffer so ffmpeg is not woken up for every 64 KiB.
+_F_SETPIPE_SZ: Optional[int] = getattr(fcntl, "F_SETPIPE_SZ", None)
+_PIPE_BUFFER_SIZE = 1 << 20
+_WRITE_BUFFER_SIZE = 1 << 16
+# Metadata files at least this large are memory-mapped instead of read into a bytes copy.
+_MMAP_THRESHOLD = 16 << 20
+
+# Hardware H.264 encoders in order of preference; libx264 is the fallback.
+_HARDWARE_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox")
+_ENCODER_PRESETS = {"h264_nvenc": "p4", "h264_qsv": "veryfast", "libx264": "veryfast"}
+_ENCODER_CACHE = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "bmwrecorder" / "encoder"
+
+if simdjson is not None:
+    # A single parser is reused for every document; creating one per file is expensive.
+    _PARSER = simdjson.Parser()
+    _ARRAY_TYPES: Tuple[type, ...] = (list, simdjson.Array)
+    _OBJECT_TYPES: Tuple[type, ...] = (dict, simdjson.Object)
+else:
+    _PARSER = None
+    _ARRAY_TYPES = (list,)
+    _OBJECT_TYPES = (dict,)
 
 Number = Union[int, float]
 TimestampValue = Union[str, Number]
 
 
 @dataclass
-class TelemetryEntry:
-    offset_seconds: float
-    display_timestamp: str
-    speed: Optional[float]
-    latitude: Optional[float]
-    longitude: Optional[float]
+class TelemetryColumns:
+    """Telemetry samples sorted by offset, stored column-wise.
 
+    Missing speed/latitude/longitude values are NaN.
+    """
 
-def find_video_file(folder: Path) -> Path:
-    for ext in (".mp4", ".ts"):
-        matches = sorted(folder.glob(f"*{ext}"))
-        if matches:
-            return matches[0]
-    raise FileNotFoundError("No .mp4 or .ts file found in the provided folder")
+    offsets: np.ndarray
+    display: List[str]
+    speed: np.ndarray
+    latitude: np.ndarray
+    longitude: np.ndarray
 
+    def __len__(self) -> int:
+        return len(self.display)
 
-def find_metadata_file(folder: Path) -> Path:
-    matches = sorted(folder.glob("*.json"))
-    if matches:
-        return matches[0]
-    raise FileNotFoundError("No .json metadata file found in the provided folder")
 
+def find_inputs(folder: Path, *, require_video: bool = True) -> Tuple[Optional[Path], Path]:
+    """Return the video and telemetry JSON in ``folder`` using a single directory scan.
 
-def parse_timestamp(value: TimestampValue) -> Union[dt.datetime, float]:
-    if isinstance(value, (int, float)):
-        return float(value)
+    MP4 files take precedence over TS files; ties are broken by name. With
+    ``require_video=False`` a folder without a video yields ``None`` for it.
+    """
+    candidates: Dict[str, List[str]] = {".mp4": [], ".ts": [], ".json": []}
+    with os.scandir(folder) as scan:
+        for item in scan:
+            name = item.name
+            bucket = candidates.get(name[name.rfind("."):].lower())
+            if bucket is not None and item.is_file():
+                bucket.append(name)
 
-    value = value.strip()
-    numeric = None
-    try:
-        numeric = float(value)
-    except ValueError:
-        pass
-    if numeric is not None:
-        return numeric
+    videos = candidates[".mp4"] or candidates[".ts"]
+    if not videos and require_video:
+        raise FileNotFoundError("No .mp4 or .ts file found in the provided folder")
+    if not candidates[".json"]:
+        raise FileNotFoundError("No .json metadata file found in the provided folder")
+    video = folder / min(videos) if videos else None
+    return video, folder / min(candidates[".json"])
 
-    iso_candidate = value
-    if iso_candidate.endswith("Z"):
-        iso_candidate = iso_candidate[:-1] + "+00:00"
-    try:
-        return dt.datetime.fromisoformat(iso_candidate)
-    except ValueError:
-        pass
 
+_CLOCK_RE = re.compile(r"(\d{1,2}):(\d{1,2}):(\d{1,2})(?:\.(\d{1,6}))?")
+
+
+def detect_kind(sample: TimestampValue) -> str:
+    """Classify a timestamp as ``"numeric"``, ``"iso"`` or ``"hms"``.
+
+    Only the first timestamp of a file is inspected; every other entry is
+    parsed with the matching function from ``_TIMESTAMP_PARSERS``.
+    """
+    if isinstance(sample, (int, float)):
+        return "numeric"
+
+    value = sample.strip()
     try:
-        return dt.datetime.strptime(value, "%H:%M:%S.%f")
+        float(value)
+        return "numeric"
     except ValueError:
         pass
 
     try:
-        return dt.datetime.strptime(value, "%H:%M:%S")
+        dt.datetime.fromisoformat(value)
+        return "iso"
     except ValueError:
         pass
 
+    if _CLOCK_RE.fullmatch(value):
+        return "hms"
+
     raise ValueError(f"Unsupported timestamp format: {value}")
 
 
-def normalize_entries(entries: Iterable[dict]) -> List[TelemetryEntry]:
-    parsed: List[Tuple[Union[dt.datetime, float], dict]] = []
-    for entry in entries:
-        if "timestamp" not in entry:
-            raise ValueError("Each telemetry entry must include a 'timestamp' field")
-        parsed.append((parse_timestamp(entry["timestamp"]), entry))
-
-    has_datetimes = any(isinstance(ts, dt.datetime) for ts, _ in parsed)
-    offsets: List[TelemetryEntry] = []
-
-    if has_datetimes:
-        datetime_entries = [(ts if isinstance(ts, dt.datetime) else None, data) for ts, data in parsed]
-        if any(ts is None for ts, _ in datetime_entries):
-            raise ValueError("Mixing absolute datetime strings with raw numeric seconds is not supported")
-        start_time = min(ts for ts, _ in datetime_entries)
-        for ts, data in datetime_entries:
-            offset = (ts - start_time).total_seconds()
-            offsets.append(
-                TelemetryEntry(
-                    offset_seconds=offset,
-                    display_timestamp=ts.isoformat(),
-                    speed=_coerce_optional_float(data.get("speed")),
-                    latitude=_coerce_optional_float(data.get("latitude")),
-                    longitude=_coerce_optional_float(data.get("longitude")),
-                )
-            )
+def _parse_iso(value: TimestampValue) -> dt.datetime:
+    return dt.datetime.fromisoformat(str(value).strip())
+
+
+def _parse_clock(value: TimestampValue) -> int:
+    """Parse ``HH:MM:SS[.ffffff]`` into whole microseconds."""
+    match = _CLOCK_RE.fullmatch(str(value).strip())
+    if match is None:
+        raise ValueError(f"Unsupported timestamp format: {value}")
+    hours, minutes, seconds, fraction = match.groups()
+    hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+    if hours > 23 or minutes > 59 or seconds > 59:
+        raise ValueError(f"Clock timestamp out of range: {value}")
+    micros = int(fraction.ljust(6, "0")) if fraction else 0
+    return ((hours * 60 + minutes) * 60 + seconds) * 1_000_000 + micros
+
+
+def _format_clock(micros: int) -> str:
+    seconds, micros = divmod(micros, 1_000_000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if micros:
+        return "%02d:%02d:%02d.%06d" % (hours, minutes, seconds, micros)
+    return "%02d:%02d:%02d" % (hours, minutes, seconds)
+
+
+_TIMESTAMP_PARSERS: Dict[str, Callable[[TimestampValue], Any]] = {
+    "numeric": float,
+    "iso": _parse_iso,
+    "hms": _parse_clock,
+}
+
+
+def _require_timestamp(entry: Mapping[str, Any]) -> TimestampValue:
+    timestamp = entry.get("timestamp")
+    if timestamp is None:
+        raise ValueError("Each telemetry entry must include a 'timestamp' field")
+    return timestamp
+
+
+def normalize_entries(entries: Iterable[Mapping[str, Any]]) -> TelemetryColumns:
+    rows = iter(entries)
+    first = next(rows, None)
+    if first is None:
+        kind = "numeric"
     else:
-        for ts, data in parsed:
-            numeric = float(ts)
-            offsets.append(
-                TelemetryEntry(
-                    offset_seconds=numeric,
-                    display_timestamp=f"{numeric:.3f}s",
-                    speed=_coerce_optional_float(data.get("speed")),
-                    latitude=_coerce_optional_float(data.get("latitude")),
-                    longitude=_coerce_optional_float(data.get("longitude")),
-                )
-            )
+        # Every entry must use the same format as the first, so decide once up front.
+        kind = detect_kind(_require_timestamp(first))
+        rows = itertools.chain((first,), rows)
+    parse = _TIMESTAMP_PARSERS[kind]
+
+    timestamps: List[Any] = []
+    speeds = array("d")
+    latitudes = array("d")
+    longitudes = array("d")
+    for entry in rows:
+        timestamp = _require_timestamp(entry)
+        try:
+            timestamps.append(parse(timestamp))
+        except ValueError:
+            raise ValueError(
+                f"Timestamp {timestamp!r} does not match the {kind} format of the first entry; "
+                "mixing timestamp formats is not supported"
+            ) from None
+        speeds.append(_coerce_float(entry.get("speed")))
+        latitudes.append(_coerce_float(entry.get("latitude")))
+        longitudes.append(_coerce_float(entry.get("longitude")))
+
+    if kind == "iso":
+        aware_count = sum(ts.utcoffset() is not None for ts in timestamps)
+        if 0 < aware_count < len(timestamps):
+            raise ValueError("Mixing timezone-aware and naive ISO timestamps is not supported")
+        absolute = np.array([_as_naive_utc(ts) for ts in timestamps], dtype="datetime64[us]")
+        offsets = (absolute - absolute.min()).astype(np.float64) / 1e6
+        display = [ts.isoformat() for ts in timestamps]
+    elif kind == "hms":
+        clock = np.asarray(timestamps, dtype=np.int64)
+        offsets = (clock - clock.min()).astype(np.float64) / 1e6
+        display = [_format_clock(micros) for micros in timestamps]
+    else:
+        offsets = np.asarray(timestamps, dtype=np.float64)
+        display = [f"{numeric:.3f}s" for numeric in offsets.tolist()]
+
+    order = np.argsort(offsets, kind="stable")
+    return TelemetryColumns(
+        offsets=offsets[order],
+        display=[display[idx] for idx in order.tolist()],
+        speed=np.frombuffer(speeds, dtype=np.float64)[order],
+        latitude=np.frombuffer(latitudes, dtype=np.float64)[order],
+        longitude=np.frombuffer(longitudes, dtype=np.float64)[order],
+    )
 
-    offsets.sort(key=lambda entry: entry.offset_seconds)
-    return offsets
 
+def _as_naive_utc(value: dt.datetime) -> dt.datetime:
+    if value.utcoffset() is None:
+        return value
+    return value.astimezone(dt.timezone.utc).replace(tzinfo=None)
 
-def _coerce_optional_float(value: Optional[object]) -> Optional[float]:
+
+def _coerce_float(value: Optional[object]) -> float:
+    """Convert a telemetry value to float, using NaN for missing or invalid values."""
     if value is None:
-        return None
+        return math.nan
     try:
         return float(value)
     except (TypeError, ValueError):
-        return None
+        return math.nan
 
 
 def srt_timestamp(seconds: float) -> str:
-    seconds = max(0, seconds)
-    hours, remainder = divmod(seconds, 3600)
-    minutes, remainder = divmod(remainder, 60)
-    secs, millis = divmod(remainder, 1)
-    return f"{int(hours):02}:{int(minutes):02}:{int(secs):02},{int(round(millis * 1000)):03}"
-
-
-def build_srt(entries: List[TelemetryEntry], speed_unit: str) -> str:
-    lines: List[str] = []
-    for idx, entry in enumerate(entries, start=1):
-        end_time = entries[idx].offset_seconds if idx < len(entries) else entry.offset_seconds + 1.0
-        caption_lines = [f"Time: {entry.display_timestamp}"]
-        if entry.speed is not None:
-            caption_lines.append(f"Speed: {entry.speed:.1f} {speed_unit}")
-        if entry.latitude is not None or entry.longitude is not None:
+    millis = max(0, int(seconds * 1000 + 0.5))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return "%02d:%02d:%02d,%03d" % (hours, minutes, secs, millis)
+
+
+def srt_timestamps(seconds: np.ndarray) -> List[str]:
+    """Vectorized :func:`srt_timestamp` for a whole column of offsets."""
+    millis = (np.maximum(seconds, 0) * 1000 + 0.5).astype(np.int64)
+    hours, millis = np.divmod(millis, 3_600_000)
+    minutes, millis = np.divmod(millis, 60_000)
+    secs, millis = np.divmod(millis, 1000)
+    return [
+        "%02d:%02d:%02d,%03d" % parts
+        for parts in zip(hours.tolist(), minutes.tolist(), secs.tolist(), millis.tolist())
+    ]
+
+
+def iter_srt(telemetry: TelemetryColumns, speed_unit: str) -> Iterator[str]:
+    """Yield the SRT document one caption block at a time."""
+    offsets = telemetry.offsets
+    # Each caption ends where the next one starts; the last one is shown for a second.
+    stamps = srt_timestamps(np.append(offsets, offsets[-1:] + 1.0))
+    speeds = telemetry.speed.tolist()
+    latitudes = telemetry.latitude.tolist()
+    longitudes = telemetry.longitude.tolist()
+    has_speed = (~np.isnan(telemetry.speed)).tolist()
+    has_latitude = (~np.isnan(telemetry.latitude)).tolist()
+    has_longitude = (~np.isnan(telemetry.longitude)).tolist()
+    for idx, display in enumerate(telemetry.display, start=1):
+        row = idx - 1
+        caption_lines = [f"Time: {display}"]
+        if has_speed[row]:
+            caption_lines.append(f"Speed: {speeds[row]:.1f} {speed_unit}")
+        if has_latitude[row] or has_longitude[row]:
             caption_lines.append(
-                f"Lat/Lon: {entry.latitude if entry.latitude is not None else '—'}, "
-                f"{entry.longitude if entry.longitude is not None else '—'}"
+                f"Lat/Lon: {latitudes[row] if has_latitude[row] else '—'}, "
+                f"{longitudes[row] if has_longitude[row] else '—'}"
             )
 
-        lines.extend([
-            str(idx),
-            f"{srt_timestamp(entry.offset_seconds)} --> {srt_timestamp(end_time)}",
-            "\n".join(caption_lines),
-            "",
-        ])
-    return "\n".join(lines).strip() + "\n"
+        # Blocks are separated by a blank line; the first one has nothing before it.
+        separator = "\n" if idx > 1 else ""
+        caption = "\n".join(caption_lines)
+        yield (
+            f"{separator}{idx}\n"
+            f"{stamps[idx - 1]} --> {stamps[idx]}\n"
+            f"{caption}\n"
+        )
+
+
+def build_srt(telemetry: TelemetryColumns, speed_unit: str) -> str:
+    return "".join(iter_srt(telemetry, speed_unit=speed_unit))
 
 
-def write_srt(entries: List[TelemetryEntry], destination: Path, speed_unit: str) -> Path:
+def write_srt(telemetry: TelemetryColumns, destination: Path, speed_unit: str) -> Path:
     destination.parent.mkdir(parents=True, exist_ok=True)
-    destination.write_text(build_srt(entries, speed_unit=speed_unit), encoding="utf-8")
+    with destination.open("w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as handle:
+        handle.writelines(iter_srt(telemetry, speed_unit=speed_unit))
     return destination
 
 
-def run_ffmpeg(video_path: Path, srt_path: Path, output_path: Path) -> None:
+@dataclass(frozen=True)
+class FfmpegOptions:
+    encoder: str = "libx264"
+    hwaccel: str = "auto"
+    # The input is a live MPEG-TS stream (e.g. a FIFO fed by a capture tool).
+    live_input: bool = False
+
+
+def _ffmpeg_command(video_path: Path, srt_path: Path, output_path: Path, options: FfmpegOptions) -> List[str]:
+    command = ["ffmpeg", "-y"]
+    if options.hwaccel != "none":
+        command += ["-hwaccel", options.hwaccel]
+    if options.live_input:
+        command += ["-f", "mpegts", "-fflags", "+nobuffer", "-flags", "low_delay"]
+    command += ["-i", str(video_path), "-vf", f"subtitles={srt_path}", "-c:v", options.encoder]
+    preset = _ENCODER_PRESETS.get(options.encoder)
+    if preset is not None:
+        command += ["-preset", preset]
+    command += ["-threads", "0", "-c:a", "copy", str(output_path)]
+    return command
+
+
+def run_ffmpeg(video_path: Path, srt_path: Path, output_path: Path, options: FfmpegOptions = FfmpegOptions()) -> None:
+    subprocess.run(_ffmpeg_command(video_path, srt_path, output_path, options), check=True)
+
+
+def _encoder_works(encoder: str) -> bool:
     command = [
         "ffmpeg",
-        "-y",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
         "-i",
-        str(video_path),
-        "-vf",
-        f"subtitles={srt_path}",
-        "-c:a",
-        "copy",
-        str(output_path),
+        "color=size=256x256:duration=0.1",
+        "-c:v",
+        encoder,
+        "-f",
+        "null",
+        "-",
     ]
-    subprocess.run(command, check=True)
+    try:
+        return subprocess.run(command, capture_output=True, timeout=30).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
 
 
-def load_metadata(metadata_path: Path) -> List[dict]:
-    payload = json.loads(metadata_path.read_text(encoding="utf-8"))
-    if isinstance(payload, list):
+def _probe_encoder() -> str:
+    try:
+        listing = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "libx264"
+
+    available = {fields[1] for fields in map(str.split, listing.splitlines()) if len(fields) > 1}
+    for encoder in _HARDWARE_ENCODERS:
+        # Encoders compiled into ffmpeg are listed even without the matching
+        # hardware, so only a test encode tells us whether one is usable.
+        if encoder in available and _encoder_works(encoder):
+            return encoder
+    return "libx264"
+
+
+def detect_encoder() -> str:
+    """Pick the fastest working H.264 encoder, falling back to libx264.
+
+    Probing runs a short test encode per hardware encoder, so the result is
+    cached on disk and reused until the ffmpeg binary changes.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return "libx264"
+    info = os.stat(ffmpeg)
+    cache_key = f"{ffmpeg}:{info.st_size}:{info.st_mtime_ns}"
+
+    try:
+        cached_key, cached_encoder = _ENCODER_CACHE.read_text(encoding="utf-8").splitlines()
+        if cached_key == cache_key:
+            return cached_encoder
+    except (OSError, ValueError):
+        pass
+
+    encoder = _probe_encoder()
+    try:
+        _ENCODER_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        _ENCODER_CACHE.write_text(f"{cache_key}\n{encoder}\n", encoding="utf-8")
+    except OSError:
+        pass
+    return encoder
+
+
+def _open_fifo_writer(fifo_path: Path, process: subprocess.Popen) -> int:
+    """Open ``fifo_path`` for writing once ffmpeg has opened it for reading.
+
+    A plain blocking open would hang forever if ffmpeg exits before reaching the
+    subtitles filter, so poll with O_NONBLOCK until a reader shows up.
+    """
+    while True:
+        try:
+            fd = os.open(fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            break
+        except OSError as exc:
+            if exc.errno != errno.ENXIO:
+                raise
+        if process.poll() is not None:
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+        time.sleep(0.01)
+
+    os.set_blocking(fd, True)
+    if _F_SETPIPE_SZ is not None:
+        try:
+            fcntl.fcntl(fd, _F_SETPIPE_SZ, _PIPE_BUFFER_SIZE)
+        except OSError:
+            pass  # Capped by /proc/sys/fs/pipe-max-size; the default buffer still works.
+    return fd
+
+
+def stream_ffmpeg(
+    telemetry: TelemetryColumns,
+    video_path: Path,
+    srt_path: Path,
+    output_path: Path,
+    speed_unit: str,
+    options: FfmpegOptions = FfmpegOptions(),
+) -> Path:
+    """Burn subtitles while feeding the SRT to ffmpeg through a named pipe.
+
+    The captions are written to ``srt_path`` at the same time, so the SRT
+    output is identical to the file-based path but ffmpeg never re-reads it.
+    """
+    srt_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="bmwrecorder-") as fifo_dir:
+        fifo_path = Path(fifo_dir) / "telemetry.srt"
+        os.mkfifo(fifo_path)
+        try:
+            process = subprocess.Popen(_ffmpeg_command(video_path, fifo_path, output_path, options))
+        except OSError:
+            # ffmpeg is missing or not executable; still leave the requested SRT behind.
+            write_srt(telemetry, srt_path, speed_unit)
+            raise
+        complete = False
+        try:
+            fd = _open_fifo_writer(fifo_path, process)
+            try:
+                pipe = os.fdopen(fd, "w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE)
+                with pipe, srt_path.open("w", encoding="utf-8", buffering=_WRITE_BUFFER_SIZE) as copy:
+                    for block in iter_srt(telemetry, speed_unit=speed_unit):
+                        copy.write(block)
+                        pipe.write(block)
+                complete = True
+            except BrokenPipeError:
+                pass  # ffmpeg exited early; its return code below tells us why.
+        except subprocess.CalledProcessError:
+            # ffmpeg exited before opening the subtitles, so nothing was written yet.
+            write_srt(telemetry, srt_path, speed_unit)
+            raise
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        returncode = process.wait()
+    if not complete:
+        write_srt(telemetry, srt_path, speed_unit)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, process.args)
+    return srt_path
+
+
+def _parse_json(data: Union[bytes, memoryview]) -> Any:
+    global _PARSER
+    if _PARSER is not None:
+        # Leaves the document as lazy simdjson proxies; values are only
+        # materialized for the keys normalize_entries actually reads.
+        try:
+            return _PARSER.parse(data)
+        except RuntimeError:
+            # simdjson refuses to reuse a parser while proxies from its previous
+            # document are alive (e.g. pinned by a traceback); swap in a new one.
+            _PARSER = simdjson.Parser()
+            return _PARSER.parse(data)
+    return _json.loads(data)
+
+
+def _read_json(metadata_path: Path) -> Any:
+    with metadata_path.open("rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size < _MMAP_THRESHOLD or (_PARSER is None and not _JSON_ACCEPTS_BUFFERS):
+            return _parse_json(handle.read())
+        # Both simdjson and orjson copy what they keep out of the buffer, so the
+        # mapping can be released as soon as parsing returns.
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            return _parse_json(view)
+
+
+def load_metadata(metadata_path: Path) -> Sequence[Mapping[str, Any]]:
+    payload = _read_json(metadata_path)
+    if isinstance(payload, _ARRAY_TYPES):
         return payload
-    if isinstance(payload, dict):
+    if isinstance(payload, _OBJECT_TYPES):
         for key in ("data", "entries", "points"):
-            if key in payload and isinstance(payload[key], list):
+            if key in payload and isinstance(payload[key], _ARRAY_TYPES):
                 return payload[key]
     raise ValueError("Metadata JSON must be a list or contain a top-level 'data' array")
 
 
-def process_folder(folder: Path, *, output_video: Optional[Path], srt_output: Path, speed_unit: str) -> Tuple[Path, Optional[Path]]:
-    video = find_video_file(folder)
-    metadata_file = find_metadata_file(folder)
-    entries = normalize_entries(load_metadata(metadata_file))
-    srt_path = write_srt(entries, srt_output, speed_unit)
+def process_folder(
+    folder: Path,
+    *,
+    output_video: Optional[Path],
+    srt_output: Path,
+    speed_unit: str,
+    ffmpeg_options: FfmpegOptions = FfmpegOptions(),
+    input_video: Optional[Path] = None,
+) -> Tuple[Path, Optional[Path]]:
+    video, metadata_file = find_inputs(folder, require_video=input_video is None)
+    if input_video is not None:
+        video = input_video
+    telemetry = normalize_entries(load_metadata(metadata_file))
+
+    if output_video is None:
+        return write_srt(telemetry, srt_output, speed_unit), None
+
+    with _ffmpeg_slot():
+        if hasattr(os, "mkfifo"):
+            srt_path = stream_ffmpeg(telemetry, video, srt_output, output_video, speed_unit, ffmpeg_options)
+        else:
+            srt_path = write_srt(telemetry, srt_output, speed_unit)
+            run_ffmpeg(video, srt_path, output_video, ffmpeg_options)
+    return srt_path, output_video
+
+
+def make_input_fifo(path: Path) -> Path:
+    """Create a named pipe at ``path`` for a capture tool to stream MPEG-TS into.
+
+    An existing FIFO is reused; any other existing file is an error.
+    """
+    try:
+        os.mkfifo(path)
+    except FileExistsError:
+        if not stat.S_ISFIFO(path.stat().st_mode):
+            raise FileExistsError(f"{path} already exists and is not a FIFO") from None
+    return path
+
+
+# Limits concurrent ffmpeg renders across batch workers; unset outside batch mode.
+_FFMPEG_SLOTS: Optional[Any] = None
+
 
-    output = None
+def _ffmpeg_slot() -> ContextManager[Any]:
+    return _FFMPEG_SLOTS if _FFMPEG_SLOTS is not None else contextlib.nullcontext()
+
+
+def _init_batch_worker(slots: Any) -> None:
+    global _FFMPEG_SLOTS
+    _FFMPEG_SLOTS = slots
+
+
+def _batch_output_path(folder: Path, path: Path) -> Path:
+    """Place a batch folder's output under a subdirectory named after the folder."""
+    return path.parent / folder.name / path.name
+
+
+def process_batch(
+    parent: Path,
+    *,
+    output_video: Optional[Path],
+    srt_output: Path,
+    speed_unit: str,
+    ffmpeg_options: FfmpegOptions = FfmpegOptions(),
+    jobs: int = 1,
+    max_encodes: int = 1,
+) -> int:
+    """Process every subfolder of ``parent`` in a process pool.
+
+    Results are printed as folders finish. Returns the number of folders that failed.
+    """
+    output_dirs = {srt_output.parent.resolve()}
     if output_video is not None:
-        run_ffmpeg(video, srt_path, output_video)
-        output = output_video
-    return srt_path, output
+        output_dirs.add(output_video.parent.resolve())
+    folders = sorted(path for path in parent.iterdir() if path.is_dir() and path.resolve() not in output_dirs)
+    if not folders:
+        print(f"No subfolders found in {parent}")
+        return 0
+
+    failures = 0
+    slots = multiprocessing.Semaphore(max_encodes)
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(folders)), initializer=_init_batch_worker, initargs=(slots,)
+    ) as executor:
+        futures = {
+            executor.submit(
+                process_folder,
+                folder,
+                output_video=None if output_video is None else _batch_output_path(folder, output_video),
+                srt_output=_batch_output_path(folder, srt_output),
+                speed_unit=speed_unit,
+                ffmpeg_options=ffmpeg_options,
+            ): folder
+            for folder in folders
+        }
+        for future in as_completed(futures):
+            folder = futures[future]
+            try:
+                srt_path, output_path = future.result()
+            except subprocess.CalledProcessError as exc:
+                failures += 1
+                print(f"{folder.name}: ffmpeg failed with exit code {exc.returncode}")
+            except Exception as exc:  # One bad folder should not abort the rest of the batch.
+                failures += 1
+                print(f"{folder.name}: {exc}")
+            else:
+                suffix = "" if output_path is None else f", overlay video written to: {output_path}"
+                print(f"{folder.name}: SRT written to: {srt_path}{suffix}")
+    return failures
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer, got {value!r}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 
 def parse_args() -> argparse.Namespace:
@@ -214,7 +656,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "folder",
         type=Path,
-        help="Folder containing a telemetry JSON file and an .mp4 or .ts video",
+        help="Folder containing a telemetry JSON file and an .mp4 or .ts video (or, with --batch, a folder of such folders)",
     )
     parser.add_argument(
         "--speed-unit",
@@ -238,6 +680,40 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Only write the SRT file and skip ffmpeg video rendering",
     )
+    parser.add_argument(
+        "--encoder",
+        default="auto",
+        help="ffmpeg video encoder, e.g. libx264 or h264_nvenc. 'auto' picks a working hardware encoder if available.",
+    )
+    parser.add_argument(
+        "--hwaccel",
+        default="auto",
+        help="ffmpeg -hwaccel method used to decode the input video, or 'none' to decode on the CPU",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Process every subfolder of FOLDER in parallel; outputs go to a subdirectory named after each folder",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help="Number of folders processed in parallel in --batch mode",
+    )
+    parser.add_argument(
+        "--max-encodes",
+        type=_positive_int,
+        default=1,
+        help="Maximum concurrent ffmpeg renders in --batch mode; raise this on machines with several GPUs",
+    )
+    parser.add_argument(
+        "--input-fifo",
+        type=Path,
+        default=None,
+        help="Create a named pipe at this path and read the video from it as a live MPEG-TS stream "
+        "instead of the video in FOLDER",
+    )
     return parser.parse_args()
 
 
@@ -248,6 +724,36 @@ def main() -> None:
         raise SystemExit(f"Provided folder does not exist: {folder}")
 
     output_video = None if args.srt_only else args.output_video
+    input_video = None
+    if args.input_fifo is not None:
+        if args.batch or output_video is None:
+            raise SystemExit("--input-fifo cannot be combined with --batch or --srt-only")
+        if not hasattr(os, "mkfifo"):
+            raise SystemExit("--input-fifo requires a platform with named pipes")
+        try:
+            input_video = make_input_fifo(args.input_fifo.expanduser())
+        except OSError as exc:
+            raise SystemExit(str(exc))
+        print(f"Waiting for an MPEG-TS stream on: {input_video}")
+
+    ffmpeg_options = FfmpegOptions()
+    if output_video is not None:
+        encoder = detect_encoder() if args.encoder == "auto" else args.encoder
+        ffmpeg_options = FfmpegOptions(encoder=encoder, hwaccel=args.hwaccel, live_input=input_video is not None)
+
+    if args.batch:
+        failures = process_batch(
+            folder,
+            output_video=output_video,
+            srt_output=args.srt_output,
+            speed_unit=args.speed_unit,
+            ffmpeg_options=ffmpeg_options,
+            jobs=args.jobs,
+            max_encodes=args.max_encodes,
+        )
+        if failures:
+            raise SystemExit(f"{failures} folder(s) failed")
+        return
 
     try:
         srt_path, output_path = process_folder(
@@ -255,6 +761,8 @@ def main() -> None:
             output_video=output_video,
             srt_output=args.srt_output,
             speed_unit=args.speed_unit,
+            ffmpeg_options=ffmpeg_options,
+            input_video=input_video,
         )
     except FileNotFoundError as exc:
         raise SystemExit(str(exc))